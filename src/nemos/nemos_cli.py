@@ -1,35 +1,184 @@
+from __future__ import annotations
 import os
+import re
 import sys
 import shutil
 import argparse
+import functools
 from pathlib import Path
-import keyring
-#import getpass
-import pwinput
-import xmlrpc.client
-from platformdirs import PlatformDirs
-import json
-import time
 from collections import defaultdict
+from typing import TYPE_CHECKING
+# heavier modules (keyring, pwinput, xmlrpc, platformdirs, rich, ...) are imported
+# only in the functions that need them, to keep `nemos --help` etc. fast
 
 #import subprocess
 
 import logging
-#logging.basicConfig(format='%(levelname)s:%(filename)s:%(lineno)d: %(message)s', level=logging.DEBUG)
-logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# if 'rich' is installed, use it to for misc. enhancements:
-try:
-	from rich import print    # adds highlighting to normal print - see https://rich.readthedocs.io/en/stable/introduction.html#quick-start
-	from rich import inspect  # object inspection in interactive session - see https://rich.readthedocs.io/en/stable/introduction.html#rich-inspect
-	from rich.logging import RichHandler  # handler that adds some colour to logging - see https://rich.readthedocs.io/en/stable/logging.html
-	# this will do detailed reporting of _unhandled_ exceptions
-	from rich.traceback import install
-	install(show_locals=True)
-	_has_rich = True
-except:
-	_has_rich = False
+if TYPE_CHECKING:
+	import xmlrpc.client
+
+_has_rich = False
+
+# accepted answers to yes/no prompts (default is yes; 'j' is for 'ja')
+_YES = frozenset(('', 'y', 'Y', 'j', 'J'))
+
+# NEOS job statuses while the job is queued, running, or done
+_VALID_STATUSES = frozenset(('Waiting', 'Running', 'Done'))
+
+# one `key=value` entry in the options string (value may include further '=')
+_OPT_RE = re.compile(r'(\S+?)=(\S*)')
+
+# max. age of the stored NEOS solver lists, in seconds (they change rarely)
+_NEOS_CACHE_MAX_AGE = 7 * 24 * 3600
+# max. age of the lists when re-checking a value that was not found in them
+_NEOS_CACHE_RECHECK_AGE = 60
+
+# options meant for this script, i.e., not to be passed to the solver
+_SCRIPT_OPTIONS = frozenset(('category', 'solver', 'priority', 'compress', 'email', 'user'))
+
+
+@functools.lru_cache(maxsize=1)  # run only once
+def _install_rich() -> None:
+	'''
+	if 'rich' is installed, use it to for misc. enhancements
+
+	This is done only in interactive use (or if env. variable NEMOS_RICH=1),
+	not when called from Mosel, where it would only slow down the start.
+	'''
+	global _has_rich, print, inspect, RichHandler
+	interactive = sys.stderr.isatty() and not os.environ.get('neos_options')
+	if not (os.environ.get('NEMOS_RICH', '') == '1' or interactive):
+		return
+	try:
+		from rich import print    # adds highlighting to normal print - see https://rich.readthedocs.io/en/stable/introduction.html#quick-start
+		from rich import inspect  # object inspection in interactive session - see https://rich.readthedocs.io/en/stable/introduction.html#rich-inspect
+		from rich.logging import RichHandler  # handler that adds some colour to logging - see https://rich.readthedocs.io/en/stable/logging.html
+		# this will do detailed reporting of _unhandled_ exceptions
+		# - local variables are shown only on request, since they can include
+		#   the whole (potentially large and sensitive) NL model
+		from rich.traceback import install
+		if os.environ.get('NEMOS_DEBUG'):
+			install(show_locals=True)
+		else:
+			install(show_locals=False, max_frames=10)
+		_has_rich = True
+	except:
+		_has_rich = False
+
+
+def _setup_logging() -> None:
+	'''
+	configure logging for the command-line use, unless it is already configured
+
+	This is not done on import, so that other code importing the module can
+	use its own logging configuration.
+	'''
+	if logging.getLogger().handlers:
+		return
+	#logging.basicConfig(format='%(levelname)s:%(filename)s:%(lineno)d: %(message)s', level=logging.DEBUG)
+	if _has_rich:
+		logging.basicConfig(format='%(message)s', level=logging.INFO, handlers=[RichHandler(show_time=False, show_path=False)])
+	else:
+		logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+
+def _json_loads(data: bytes):
+	'''
+	parse JSON data given as bytes, using the faster 'orjson' if installed
+	'''
+	try:
+		import orjson
+		return orjson.loads(data)
+	except ImportError:
+		import json
+		return json.loads(data)  # accepts bytes -> no need to decode first
+
+
+def _json_dumps(data, use_orjson: bool = False) -> bytes:
+	'''
+	serialize data to indented JSON bytes
+
+	With `use_orjson`, the faster 'orjson' is used if installed - but its
+	output differs (2-space indent), so it is meant only for internal files.
+	User-editable files always get the same, tab-indented layout.
+	'''
+	if use_orjson:
+		try:
+			import orjson
+			return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+		except ImportError:
+			pass
+	import json
+	return json.dumps(data, indent='\t').encode()
+
+
+def _atomic_write_json(path: Path, data, use_orjson: bool = False) -> bool:
+	'''
+	write data as JSON to a file, unless the file already has the same content
+
+	The data are written to a temporary file that then replaces the target,
+	so an interrupted write cannot leave a corrupted file behind.
+
+	Args:
+		path: path of the file to write
+		data: data to be serialized
+		use_orjson: passed to `_json_dumps`; only for files not edited by users
+
+	Returns:
+		True if the file was written, False if it was already up to date
+	'''
+	new_bytes = _json_dumps(data, use_orjson)
+	path = path.resolve()  # replace the target of a symlink, not the link itself
+	try:
+		if path.read_bytes() == new_bytes:
+			return False
+	except OSError:
+		pass  # file does not exist (or cannot be read) -> write it
+	# keep the mode of the existing file; new files get the default one (umask)
+	try:
+		mode = os.stat(path).st_mode & 0o7777
+	except OSError:
+		umask = os.umask(0)
+		os.umask(umask)
+		mode = 0o666 & ~umask
+	# unique temporary file in the same directory, so that concurrent runs
+	# do not write to the same file and `os.replace` stays on one file system
+	import tempfile
+	fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+	try:
+		with os.fdopen(fd, 'wb') as f:
+			f.write(new_bytes)
+		os.chmod(tmp_name, mode)  # `mkstemp` creates the file with mode 0o600
+		os.replace(tmp_name, path)
+	except BaseException:
+		os.unlink(tmp_name)
+		raise
+	return True
+
+
+def _write_bytes_unbuffered(path: Path, data: bytes) -> None:
+	'''
+	write bytes to a file with low-level IO, without Python's buffering
+
+	The data are already in memory as one block, so the buffer would be just
+	an extra copy. On systems that support it, the file is also pre-allocated.
+	'''
+	flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)  # O_BINARY is Windows-only
+	fd = os.open(path, flags, 0o666)  # as `open()` does, i.e., restricted by the umask
+	try:
+		if hasattr(os, 'posix_fallocate') and len(data) > 0:
+			try:
+				os.posix_fallocate(fd, 0, len(data))
+			except OSError:
+				pass  # not supported by the file system -> just write
+		mv = memoryview(data)
+		n_written = 0
+		while n_written < len(mv):
+			n_written += os.write(fd, mv[n_written:])
+	finally:
+		os.close(fd)
 
 
 def default_config() -> dict[str, dict]:
@@ -51,63 +200,230 @@ def default_config() -> dict[str, dict]:
 	}
 
 
+def _validate_config(config: dict) -> None:
+	'''
+	check that the configuration has all the sections and keys of the default one
+
+	This is done only when writing the config file, so reading can trust it.
+
+	Raises:
+		ValueError: if a section or a key is missing
+	'''
+	for section, keys in default_config().items():
+		if section not in config:
+			raise ValueError(f"Config is missing section `{section}`")
+		missing = keys.keys() - config[section].keys()
+		if missing:
+			raise ValueError(f"Config section `{section}` is missing keys {sorted(missing)}")
+
+
+@functools.lru_cache(maxsize=1)
 def config_file_path() -> Path:
 	'''
 	get path to the configuration file
 
-	if the file does not exist, it will be created with default values
+	The directory is created if needed, but the file itself might not exist yet:
+	it is created with default values on the first read, see `_load_config()`.
 	'''
+	from platformdirs import PlatformDirs
 	app_name = 'neos4mosel'
 	developer = 'mkaut'
 	dirs = PlatformDirs(app_name, developer)
 	cdir = dirs.user_config_path
-	if not cdir.exists():
-		Path.mkdir(cdir, parents=True)
-	cfile = cdir / 'config.json'
-	if not cfile.exists():
-		config = default_config()
-		with open(cfile, 'w') as f:
-			json.dump(config, f, indent='\t')
-		logger.info(f"Created config file `{config}`")
-	return cfile
+	cdir.mkdir(parents=True, exist_ok=True)  # no need to check for existence first
+	return cdir / 'config.json'
+
+
+def neos_cache_file_path() -> Path:
+	'''
+	get path to the file with cached NEOS solver information
+	'''
+	from platformdirs import PlatformDirs
+	dirs = PlatformDirs('neos4mosel', 'mkaut')
+	return dirs.user_cache_path / 'neos_solvers.json'
+
+
+def _load_config() -> dict:
+	'''
+	read the stored configuration from the config file (not cached)
+
+	if the file does not exist, it will be created with default values
+	'''
+	cfile = config_file_path()
+	try:
+		with open(cfile, 'rb') as f:
+			return _json_loads(f.read())
+	except FileNotFoundError:
+		pass
+	config = default_config()
+	_atomic_write_json(cfile, config)
+	logger.info(f"Created config file `{cfile}`")
+	return config
+
+
+# parsed config file and its modification time, see `get_config()`
+_CONFIG_CACHE: dict|None = None
+_CONFIG_MTIME: int|None = None
 
 
 def get_config() -> dict:
 	'''
 	get the stored configuration
+
+	The parsed config is cached and re-read only if the file has changed since.
+	The result is shared between callers, so it must not be modified; use
+	`_load_config()` to get a private copy for updating the config file.
+
+	Unlike in the file, `['neos']['forbidden_solvers']` is a frozenset of
+	case-folded solver names, for fast case-insensitive look-ups.
 	'''
+	global _CONFIG_CACHE, _CONFIG_MTIME
 	cfile = config_file_path()
-	assert cfile.is_file(), 'should be guaranteed at this point'
-	with open(cfile, 'r') as f:
-		config = json.load(f)
-	return config
+	try:
+		mtime = cfile.stat().st_mtime_ns
+	except FileNotFoundError:
+		mtime = None  # the file gets created by `_load_config()`
+	if _CONFIG_CACHE is None or mtime is None or mtime != _CONFIG_MTIME:
+		config = _load_config()
+		c_neos = config['neos']
+		c_neos['forbidden_solvers'] = frozenset(s.casefold() for s in c_neos['forbidden_solvers'])
+		_CONFIG_CACHE = config
+		_CONFIG_MTIME = mtime if mtime is not None else cfile.stat().st_mtime_ns
+	return _CONFIG_CACHE
+
+
+def invalidate_config_cache() -> None:
+	'''
+	make the next `get_config()` call re-read the config file
+	'''
+	global _CONFIG_CACHE, _CONFIG_MTIME
+	_CONFIG_CACHE = None
+	_CONFIG_MTIME = None
+
+
+@functools.lru_cache(maxsize=4)
+def _get_password_cached(keyring_id: str, user: str) -> str|None:
+	'''
+	get password from the system keyring, cached for the session
+
+	Keyring access can be slow (and even prompt the user), so we do it only once.
+	'''
+	import keyring
+	return keyring.get_password(keyring_id, user)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_credential_cached(keyring_id: str, user: str):
+	'''
+	get credentials from the system keyring, cached for the session
+	'''
+	import keyring
+	return keyring.get_credential(keyring_id, user)
+
+
+def _clear_keyring_cache() -> None:
+	'''
+	clear the cached keyring data - to be called after changing the keyring
+	'''
+	_get_password_cached.cache_clear()
+	_get_credential_cached.cache_clear()
 
 
-def get_neos_api(server_uri: str|None=None) -> xmlrpc.client.ServerProxy:
+def get_neos_api(server_uri: str|None=None, config: dict|None=None) -> xmlrpc.client.ServerProxy:
 	'''
 	connect to the NEOS XML-RPC API and return the connection object
 
 	Args:
 		server_uri: if given, use this URI instead of the one from the config file
+		config: stored configuration, if already loaded; otherwise, it is read here
 
 	Returns:
 		xmlrpc.client.ServerProxy object connected to NEOS
 	'''
-	config = get_config()
-	c_neos = config.get('neos', None)
-	assert c_neos, 'config file should always exist and have a "neos" section'
+	import xmlrpc.client
+	config = config or get_config()
+	c_neos = config['neos']
 
-	server = server_uri or c_neos.get('server', None)
+	server = server_uri or c_neos['server']
 	if not server:
 		logger.error("NEOS server URI not provided!")
 		sys.exit(1)
+	# no `neos.ping()` here: it would cost an extra round-trip to the server,
+	# and connection problems are reported by the first real call anyway
+	# - creating the proxy does not connect yet, so there is nothing to catch here
+	# - with `use_builtin_types`, base64 results are returned directly as bytes
+	return xmlrpc.client.ServerProxy(server, use_builtin_types=True)
+
+
+def get_neos_list(neos: xmlrpc.client.ServerProxy|None, method: str, max_age: float = _NEOS_CACHE_MAX_AGE):
+	'''
+	get result of a NEOS API method without arguments, cached on disk
+
+	Used for the lists of problem categories and solvers: they change rarely,
+	so we store them and ask NEOS only once the stored version is older than
+	`max_age`. If the update fails, we use the old version - unless the update
+	was explicitly requested by `max_age=0` or there is no old version, in
+	which case we exit with an error.
+
+	Args:
+		neos: connected NEOS XML-RPC API object; if None, a new one is created
+			if needed - pass the caller's object to reuse its connection
+		method: name of the API method, e.g., 'listAllSolvers'
+		max_age: maximal age of the cached result, in seconds (0 = always update)
+
+	Returns:
+		result of the API call
+	'''
+	import time
+	import xmlrpc.client
+	cfile = neos_cache_file_path()
+	cache = {}
 	try:
-		neos = xmlrpc.client.ServerProxy(server)
-		neos.ping()
-	except Exception as e:
-		logger.error("Could not reach the NEOS server: ", e)
+		with open(cfile, 'rb') as f:
+			cache = _json_loads(f.read())
+	except (OSError, ValueError):
+		pass  # no (valid) cache
+	entry = cache.get(method, None)
+	if entry and time.time() - entry['time'] < max_age:
+		return entry['data']
+
+	try:
+		if neos is None:
+			neos = get_neos_api()
+		data = getattr(neos, method)()
+	except (xmlrpc.client.Error, OSError) as e:
+		if entry and max_age > 0:
+			logger.warning(f"Could not update NEOS data from `{method}` ({e}), using stored version.")
+			return entry['data']
+		logger.error(f"Could not get NEOS data from `{method}`: {e}")
 		sys.exit(1)
-	return neos
+	cache[method] = {'time': time.time(), 'data': data}
+	try:
+		cfile.parent.mkdir(parents=True, exist_ok=True)
+		_atomic_write_json(cfile, cache, use_orjson=True)  # internal file
+	except OSError as e:
+		logger.warning(f"Could not store NEOS data from `{method}`: {e}")
+	return data
+
+
+@functools.lru_cache(maxsize=1)
+def get_solver_index(neos: xmlrpc.client.ServerProxy|None, max_age: float = _NEOS_CACHE_MAX_AGE) -> dict[str, dict[str, set[str]]]:
+	'''
+	get index of NEOS solvers, based on a single `listAllSolvers` call
+
+	Args:
+		neos: connected NEOS XML-RPC API object; if None, connect only if needed
+		max_age: maximal age of the stored solver list, in seconds
+
+	Returns:
+		dictionary category -> input method -> set of solvers
+	'''
+	index = defaultdict(lambda: defaultdict(set))
+	for sc in get_neos_list(neos, 'listAllSolvers', max_age):  # items are 'category:solver:inputMethod'
+		cat, solver, input_method = sc.split(':', 2)
+		index[cat][input_method].add(solver)
+	# return plain dicts, so look-ups of unknown keys cannot modify the cached index
+	return {cat: dict(by_input) for cat, by_input in index.items()}
 
 
 def parse_neos_options(options_str: str) -> dict[str, str]:
@@ -123,75 +439,82 @@ def parse_neos_options(options_str: str) -> dict[str, str]:
 	Returns:
 		dictionary with option key-value pairs
 	'''
-	odict = {
-		parts[0].strip().lower(): parts[1].strip()
-		for o in options_str.split()
-		if (parts := o.split('=', maxsplit=1)) and len(parts) == 2
-	}
-	return odict
+	if not options_str:
+		return {}
+	# entries without '=' are skipped, since they do not match the regex
+	return {m.group(1).lower(): m.group(2) for m in _OPT_RE.finditer(options_str)}
 
 
-def get_neos_config(odict: dict, neos: xmlrpc.client.ServerProxy) -> dict:
+def get_neos_config(odict: dict, neos: xmlrpc.client.ServerProxy, config: dict|None=None) -> dict:
 	'''
 	get NEOS server configuration information
 
 	Args:
 		odict: dictionary with NEOS options
 		neos: connected NEOS XML-RPC API object
+		config: stored configuration, if already loaded; otherwise, it is read here
 
 	Returns:
 		dictionary with NEOS configuration information
 	'''
-	config = get_config()
+	config = config or get_config()
 	c_neos = config['neos']
 	c_user = config['user']
 
-	# problem category
-	if 'category' in odict:
-		category = odict['category']
-		neos_categories = neos.listCategories()  # returns a dict: name -> description
-		if category not in neos_categories:
+	# problem category and solver
+	category = odict.get('category', c_neos['category'])
+	solver = odict.get('solver', c_neos['solver'])
+	# the defaults from the config file are trusted -> check the combination
+	# only if the category or the solver is given by the user
+	if 'category' in odict or 'solver' in odict:
+		forbidden_solvers = c_neos['forbidden_solvers']  # frozenset of case-folded names
+		def nl_solvers(index: dict) -> dict[str, str]:
+			# solvers for the given category, supporting 'NL' format
+			# - keyed by case-folded name, so the user can write e.g. 'cplex' for 'CPLEX'
+			return {
+				s.casefold(): s
+				for s in index.get(category, {}).get('NL', ())
+				if s.casefold() not in forbidden_solvers
+			}
+		index = get_solver_index(neos)
+		cat_solvers_nl = nl_solvers(index)
+		if solver.casefold() not in cat_solvers_nl:
+			# the stored solver list can be up to `_NEOS_CACHE_MAX_AGE` old
+			# -> update it before reporting an error
+			index = get_solver_index(neos, _NEOS_CACHE_RECHECK_AGE)
+			cat_solvers_nl = nl_solvers(index)
+		# - categories are checked against the solver index, i.e., only categories with some solvers
+		if category not in index:
 			logger.error(f'Unsupported problem category `{category}`')
 			logger.info(f'Supported values are:')
+			neos_categories = get_neos_list(neos, 'listCategories')  # dict: name -> description
 			for cat, descr in neos_categories.items():
 				logger.info(f"{cat}: {descr}")
 			raise ValueError(f'Unsupported problem category `{category}`')
-	else:
-		category = c_neos['category']
-
-	# solver
-	if 'solver' in odict:
-		solver = odict['solver']
-		cat_solvers_list = neos.listSolversInCategory(category)  # item = 'solver:input'
-		# set of solvers for the given category, supporting 'NL' format
-		cat_solvers_nl = {s.split(':')[0] for s in cat_solvers_list if s.split(':')[1] == 'NL'}
-		cat_solvers_nl -= set(c_neos['forbidden_solvers'])  # c_neos['forbidden_solvers'] is a list
-		if solver not in cat_solvers_nl:
+		solver = cat_solvers_nl.get(solver.casefold(), solver)  # use the name as on NEOS
+		if solver not in cat_solvers_nl.values():
 			logger.error(f"Solver {solver} is not supported for `{category}` problems with `NL` input.")
-			logger.info("Supported solvers: ", cat_solvers_nl)
+			logger.info(f"Supported solvers: {', '.join(sorted(cat_solvers_nl.values()))}")
 			raise ValueError(f"Unsupported solver `{solver}` for category `{category}`")
-	else:
-		solver = c_neos['solver']
-	#
-	neos_solvers = neos.listAllSolvers()
-	if f'{category}:{solver}:NL' not in neos_solvers:
-		logger.error(f"Specified NEOS solver `{category}:{solver}:NL` is not in the list!")
 	logger.info(f"Specified NEOS solver = `{category}:{solver}:NL`")
 
 	# priority (short or long)
 	priority = odict.get('priority', 'short')
+
+	# compression of the model file (gzip + base64)
+	compress = odict.get('compress', 'no').lower() in {'yes', 'true', '1'}
 	
 	# user authentication
-	email = odict.get('email', c_user.get('email', ''))
+	email = odict.get('email', c_user['email'])
 	if email == '':
 		raise Exception("NEOS requires email for problem submissions, please specify it.")
 	#
-	user = odict.get('user', c_user.get('user', ''))
+	user = odict.get('user', c_user['user'])
 	pwd = None
 	# TODO: if it exists in odict, remove it from there and from `options`!
 	if user != '':
 		# try to get password
-		pwd = keyring.get_password(c_user['keyring_id'], user)
+		pwd = _get_password_cached(c_user['keyring_id'], user)
 		if pwd is None:
 			logger.warning(f"No password found in the keyring for NEOS user {user}!")
 			logger.warning(" -> submitting without authentication")
@@ -202,12 +525,38 @@ def get_neos_config(odict: dict, neos: xmlrpc.client.ServerProxy) -> dict:
 		'category': category,
 		'solver': solver,
 		'priority': priority,
+		'compress': compress,
 		'email': email,
 		'user': user,
 		'pwd': pwd
 	}
 	
 
+def check_nl_format(id_char: bytes, nl_file: str|Path) -> None:
+	'''
+	check that we have ASCII NL file (binary is not supported)
+
+	NL file starts with 'g' for ASCII files and 'b' for binary files.
+
+	Args:
+		id_char: the first byte of the NL file
+		nl_file: path to the NL file, for the messages
+
+	Raises:
+		ValueError: if the file is in the binary format
+	'''
+	match id_char:
+		case b'b':
+			raise ValueError(f"""
+				NL file `{nl_file}` is in binary format, this is not supported!
+				In Mosel, use `setparam("nl_binary", false)` to switch to ascii format.
+			""")
+		case b'g':
+			pass  # this is what we want
+		case _:
+			logger.error(f"Could not detect format of NL file {nl_file} - expect problems!")
+
+
 def neos_xml_string(odict: dict, nl_file: str|Path, config: dict) -> str:
 	'''
 	create the NEOS XML string for job submission
@@ -220,27 +569,48 @@ def neos_xml_string(odict: dict, nl_file: str|Path, config: dict) -> str:
 	Returns:
 		string with the NEOS XML job submission document
 	'''
-	# read the NL file
-	with open(nl_file, 'r') as f:
-		nl_mod_str = f.read()
-
 	# options, one per line, excluding options meant for this script
-	script_options = {'category', 'solver', 'priority', 'email', 'user'}
-	neos_options = [f'{key}={val}' for key, val in odict.items() if key not in script_options]
-	opt_str = '\n'.join(neos_options)
+	opt_str = '\n'.join(f'{key}={val}' for key, val in odict.items() if key not in _SCRIPT_OPTIONS)
 
-	neos_xml = f"""\
+	# NEOS accepts gzipped and base64-encoded files inside <base64> tags
+	# - NL files compress very well, so this reduces the size of the submission
+	if config.get('compress', False):
+		model_start, model_end = '<base64>', '</base64>'
+	else:
+		model_start, model_end = '<![CDATA[', ']]>'
+
+	# the NL model can be large -> instead of formatting it into the template,
+	# join it with the parts before and after it
+	xml_head = f"""\
 <document>
 	<category>{config['category']}</category>
 	<solver>{config['solver']}</solver>
 	<inputMethod>NL</inputMethod>
 	<priority>{config['priority']}</priority>
 	<email>{config['email']}</email>
-	<model><![CDATA[{nl_mod_str}]]></model>
+	<model>{model_start}"""
+	xml_tail = f"""{model_end}</model>
 	<options><![CDATA[{opt_str}]]></options>
 	<comments><![CDATA[]]></comments>
 </document>
 """
+	# the file is memory-mapped, so the data are not copied to a read buffer first
+	# - decoding/compressing straight from the map gives only one copy of the model
+	import mmap
+	with open(nl_file, 'rb') as f:
+		if os.fstat(f.fileno()).st_size == 0:
+			return ''.join((xml_head, xml_tail))  # mmap does not support empty files
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as nl_data:
+			# the same content for both encodings: line ends converted to '\n',
+			# as reading in text mode would do (copies the data only if needed)
+			model_data = nl_data[:].replace(b'\r\n', b'\n') if nl_data.find(b'\r') >= 0 else nl_data
+			if config.get('compress', False):
+				import base64
+				import gzip
+				model = base64.b64encode(gzip.compress(model_data, compresslevel=3)).decode()
+			else:
+				model = str(model_data, 'utf-8')
+	return ''.join((xml_head, model, xml_tail))
 
 
 def solve_nl_file(nl_file: str|Path) -> None:
@@ -255,24 +625,20 @@ def solve_nl_file(nl_file: str|Path) -> None:
 	Args:
 		nl_file: path to the NL file to be solved
 	'''
+	import time
+	import xmlrpc.client
+	_install_rich()
 
 	nl_file = Path(nl_file)
 	if not nl_file.is_file():
 		raise FileNotFoundError(f"NL file `{nl_file}` not found!")
-	# check that we have ASCII NL file (binary is not supported)
-	# - NL file starts with 'g' for ASCII files and 'b' for binary files
-	with open(nl_file, 'rb') as f:
-		id_char = f.read(1).decode()  # reading binary -> have to decode
-	match id_char:
-		case 'b':
-			raise ValueError(f"""
-				NL file `{nl_file}` is in binary format, this is not supported!
-				In Mosel, use `setparam("nl_binary", false)` to switch to ascii format.
-			""")
-		case 'g':
-			pass  # this is what we want
-		case _:
-			logger.error(f"Could not detect format of NL file {nl_file} - expect problems!")
+	# check the format of the NL file before connecting to NEOS
+	# - we need only one byte -> use low-level IO without buffering
+	fd = os.open(nl_file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+	try:
+		check_nl_format(os.read(fd, 1), nl_file)
+	finally:
+		os.close(fd)
 	# for testing - copy the NL file to the working dir
 	#shutil.copy(nl_file, './tmp.nl')
 
@@ -282,8 +648,9 @@ def solve_nl_file(nl_file: str|Path) -> None:
 	logging.debug(f"NEOS options as dict: {odict}")
 
 	## NEOS setup
-	neos = get_neos_api(odict.get('server', None))
-	config = get_neos_config(neos)
+	stored_config = get_config()  # read once, pass to the functions below
+	neos = get_neos_api(odict.get('server', None), stored_config)
+	config = get_neos_config(odict, neos, stored_config)
 	neos_xml = neos_xml_string(odict, nl_file, config)
 
 	# use for testing: save a copy of the XML file to the working dir
@@ -291,54 +658,83 @@ def solve_nl_file(nl_file: str|Path) -> None:
 	#	f.write(neos_xml)
 
 	## run the job - code based on https://github.com/NEOS-Server/PythonClient
-	if config['pwd'] is not None:
-		assert config['user'] != '', 'consistency check'
-		job_id, job_pwd = neos.authenticatedSubmitJob(neos_xml, config['user'], config['pwd'])
-	else:
-		job_id, job_pwd = neos.submitJob(neos_xml)
+	try:
+		if config['pwd'] is not None:
+			assert config['user'] != '', 'consistency check'
+			job_id, job_pwd = neos.authenticatedSubmitJob(neos_xml, config['user'], config['pwd'])
+		else:
+			job_id, job_pwd = neos.submitJob(neos_xml)
+	except (xmlrpc.client.Error, OSError) as e:
+		logger.error(f"Could not submit the job to the NEOS server: {e}")
+		sys.exit(1)
 	if job_id == 0:
 		raise RuntimeError(f"NEOS job submission failed!")
 	logger.info(f"Job submitted to NEOS; job no. = {job_id}, password = {job_pwd}")
 	
 	status = neos.getJobStatus(job_id, job_pwd)
-	assert status in {'Waiting', 'Running', 'Done'}, 'check status'
+	assert status in _VALID_STATUSES, 'check status'
 
 	if config['priority'] == 'short':
 		# only jobs sumbitted with 'short' priority (max 5 minutes)
 		# report running results
+		# - `getIntermediateResults` blocks until there is new output (or the job ends),
+		#   so we call it repeatedly and check the status only if it returns nothing
+		# - if the job is still not done (e.g., waiting in a queue), wait before
+		#   the next call, with increasing delay reset whenever there is new output
+		min_delay, max_delay = 1.0, 30.0
+		delay = min_delay
+		# - the output is already bytes -> write it to stdout without decoding,
+		#   flushing after each update, so the user sees the progress live
 		offset = 0
 		print()
+		sys.stdout.flush()  # keep the order with the text written by print()
+		stdout_write = sys.stdout.buffer.write
+		stdout_flush = sys.stdout.buffer.flush
 		while status != 'Done':
-			time.sleep(1)
 			# get running results, starting from a given offset
 			# - returns the new offset, to be used for next call
 			(msg, offset) = neos.getIntermediateResults(job_id, job_pwd, offset)
-			print('\n', msg.data.decode())
+			if msg:
+				stdout_write(b'\n')
+				stdout_write(msg)
+				stdout_flush()
+				delay = min_delay
+				continue
 			status = neos.getJobStatus(job_id, job_pwd)
+			if status != 'Done':
+				time.sleep(delay)
+				delay = min(delay * 1.5, max_delay)
 	else:
 		# long priority
 		print('Job running with long priority -> no intermediate output')
 		print('Please wait')
-		t_min = 0
+		# - poll with increasing delay, up to once per minute
+		min_delay, max_delay = 5.0, 60.0
+		delay = min_delay
+		# - print one dot per minute of waiting, with a new line every hour
+		start_time = time.monotonic()
+		n_dots = 0
 		while status != 'Done':
-			time.sleep(60)
-			t_min += 1
-			print('.', end='\n' if t_min % 60 == 0 else '')
+			time.sleep(delay)
+			delay = min(delay * 1.5, max_delay)
+			while n_dots < (time.monotonic() - start_time) // 60:
+				n_dots += 1
+				print('.', end='\n' if n_dots % 60 == 0 else '', flush=True)
 			status = neos.getJobStatus(job_id, job_pwd)
 	# finished
+	# - the remaining calls reuse the already open connection
 	msg = neos.getFinalResults(job_id, job_pwd)
-	print('\n', msg.data.decode())
+	print('\n', msg.decode())
 	print()
 	logger.info(f'NEOS completion code: {neos.getCompletionCode(job_id, job_pwd)}')
 
 	## create the solution file
 	# get the file from NEOS
 	# - see documentation for a list of supported file names
-	# - use the .data member to get decoded characters
-	res = neos.getOutputFile(job_id, job_pwd, 'ampl.sol')
+	# - returns bytes, since the API object uses builtin types
+	# - write it directly, without keeping a reference to the (possibly large) result
 	sol_file = nl_file.with_suffix('.sol')
-	with open(sol_file, 'wb') as f:
-		f.write(res.data)
+	_write_bytes_unbuffered(sol_file, neos.getOutputFile(job_id, job_pwd, 'ampl.sol'))
 	
 
 # ----------------------------------------------------------------------------
@@ -350,37 +746,52 @@ def non_mosel_call(args: argparse.Namespace) -> None:
 	Args:
 		args: parsed command line arguments
 	'''
-	config = get_config()
-	assert 'neos' in config and 'user' in config, 'config file should always include "neos" and "user"'
-	c_neos = config['neos']
+	config = _load_config()  # not cached - we might modify and save it
 	c_user = config['user']
 
-	# NEOS information
 	if args.neos_info:
 		args.categories = True
 		args.cat_solvers = True
 		args.solver_cats = True
-	if args.categories or args.cat_solvers or args.solver_cats:
-		neos = get_neos_api()
-		cat_list = neos.listCategories()     # returns dictionary cat-id -> description
-		solver_comb = neos.listAllSolvers()  # returns list of 'category:solver:inputMethod
-		forbidden_solvers = set(c_neos.get('forbidden_solvers', []))
-		solver_comb_nl = [
-			scl[:2]
-			for sc in solver_comb
-			if (scl := sc.split(':'))[2] == 'NL' and scl[1] not in forbidden_solvers
-		]
+	# one API object for all NEOS calls below, so they share the connection
+	# - creating it does not connect: with stored lists, there is no network access
+	neos = None
+	if args.ping or args.refresh_neos_info or args.categories or args.cat_solvers or args.solver_cats:
+		neos = get_neos_api(config=config)
+
+	# NEOS connection check
+	if args.ping:
+		try:
+			logger.info(f"NEOS server: {neos.ping().strip()}")
+		except Exception as e:
+			logger.error(f"Could not reach the NEOS server: {e}")
+			sys.exit(1)
 
+	# NEOS information
+	# - the lists are stored locally, so we connect to NEOS only if they are too old
+	max_age = 0 if args.refresh_neos_info else _NEOS_CACHE_MAX_AGE
+	if args.refresh_neos_info and not (args.categories or args.cat_solvers or args.solver_cats):
+		for method in ('listAllSolvers', 'listCategories'):
+			get_neos_list(neos, method, max_age)  # exits on connection errors
+		logger.info("Updated the stored NEOS solver information.")
+	if args.categories or args.cat_solvers or args.solver_cats:
+		solver_comb = get_neos_list(neos, 'listAllSolvers', max_age)  # list of 'category:solver:inputMethod'
+		# - `config` is the raw file content, with a list of solver names
+		forbidden_solvers = frozenset(s.casefold() for s in config['neos']['forbidden_solvers'])
 		cat_solvers = defaultdict(list)
 		solver_cats = defaultdict(list)
-		for cat, solver in solver_comb_nl:
+		for sc in solver_comb:
+			cat, solver, input_method = sc.split(':', 2)
+			if input_method != 'NL' or solver.casefold() in forbidden_solvers:
+				continue
 			cat_solvers[cat].append(solver)
 			solver_cats[solver].append(cat)
 
 		if args.categories:
+			cat_list = get_neos_list(neos, 'listCategories', max_age)  # dictionary cat-id -> description
 			print(f"\nSupported problem categories:")
 			for cat in cat_solvers.keys():
-				print(f"{cat:<5s} : {cat_list[cat]}")
+				print(f"{cat:<5s} : {cat_list.get(cat, '')}")  # the two lists are stored separately
 		if args.cat_solvers:
 			print(f"\nSolvers per problem category:")
 			for cat, solvers in cat_solvers.items():
@@ -394,12 +805,9 @@ def non_mosel_call(args: argparse.Namespace) -> None:
 	# remaining options should be for credential management
 	# - email and (optionally) NEOS username are stored in config
 	# - password for the username is stored in the keyring
-	email = c_user.get('email', '')
-	user = c_user.get('user', '')
-	if user != '':
-		cred = keyring.get_credential(c_user['keyring_id'], user)
-	else:
-		cred = None
+	# - the keyring is accessed only by the options that need it
+	email = c_user['email']
+	user = c_user['user']
 
 	save_config = False
 	if args.show_email:
@@ -413,7 +821,7 @@ def non_mosel_call(args: argparse.Namespace) -> None:
 			if args.email != email:
 				logger.warning(f"There is already a stored email: `{email}`")
 				ans = input('Overwrite it with the `{args.email}`? [Y/n] ')
-				if ans not in {'', 'y', 'Y', 'j', 'J'}:
+				if ans not in _YES:
 					update = False
 			else:
 				logger.info(f"This email is already in the config file.")
@@ -428,15 +836,20 @@ def non_mosel_call(args: argparse.Namespace) -> None:
 		else:
 			logger.info("No username stored for NEOS.")
 	elif args.set_cred:
+		cred = _get_credential_cached(c_user['keyring_id'], user) if user != '' else None
 		update = True
 		if cred:
 			logger.warning(f"There are already stored credentials for NEOS user `{cred.username}`!")
 			ans = input('Delete them and enter new? [Y/n] ')
-			if ans in {'', 'y', 'Y', 'j', 'J'}:
+			if ans in _YES:
+				import keyring
 				keyring.delete_password(c_user['keyring_id'], cred.username)
+				_clear_keyring_cache()
 			else:
 				update = False
 		if update:
+			import keyring
+			import pwinput
 			user = input('NEOS username: ')
 			while True:
 				pwd = pwinput.pwinput(prompt='NEOS password: ')
@@ -445,26 +858,52 @@ def non_mosel_call(args: argparse.Namespace) -> None:
 			c_user['user'] = user
 			save_config = True
 			keyring.set_password(c_user['keyring_id'], user, pwd)
+			_clear_keyring_cache()
 	elif args.del_cred:
+		cred = _get_credential_cached(c_user['keyring_id'], user) if user != '' else None
 		if not cred:
 			logger.warning("No NEOS credentials found - nothing to delete")
 			sys.exit(1)
+		import keyring
 		keyring.delete_password(c_user['keyring_id'], cred.username)
+		_clear_keyring_cache()
 		c_user['user'] = ''
 		save_config = True
 	
 	if save_config:
-		with open(config_file_path(), 'w') as f:
-			json.dump(config, f, indent='\t')
+		_validate_config(config)
+		if _atomic_write_json(config_file_path(), config):
+			invalidate_config_cache()
 
 
 # ----------------------------------------------------------------------------
-def main(argv=None):
-	#log_levels = [v.lower() for k,v in logging._levelToName.items() if k > 0]
-	termWidth = shutil.get_terminal_size()[0]
-	helpFormatter = lambda prog: argparse.HelpFormatter(prog, max_help_position=30, width=termWidth)
+class _NemosHelp(argparse.HelpFormatter):
+	'''
+	help formatter using the full terminal width
+	'''
+	def __init__(self, prog):
+		super().__init__(prog, max_help_position=30, width=shutil.get_terminal_size().columns)
+
+
+def _mosel_call_args(argv: list[str]) -> bool:
+	'''
+	check if the arguments look like a call from Mosel: `nemos file.nl [...] -s -e`
+
+	Only plain arguments and the two Mosel flags are allowed, so anything else
+	(including misspelled options) is left to the full argument parser.
+	'''
+	return (
+		len(argv) > 0
+		and argv[0].endswith('.nl')
+		and all(a in {'-s', '-e'} or not a.startswith('-') for a in argv[1:])
+	)
+
 
-	parser = argparse.ArgumentParser(prog='nemos', description='Mosel interface to NEOS solvers', formatter_class=helpFormatter)
+def _build_parser() -> argparse.ArgumentParser:
+	'''
+	build the full command line parser
+	'''
+	parser = argparse.ArgumentParser(prog='nemos', description='Mosel interface to NEOS solvers', formatter_class=_NemosHelp)
 	# positional arguments sent by Mosel: path to NL file and 'writesol'
 	parser.add_argument('args', nargs='*', help='arguments Mosel sends to the solver')
 	# keyword arguments sent by Mosel - hide from the help
@@ -483,12 +922,33 @@ def main(argv=None):
 	neos.add_argument('--cat-solvers', action='store_true', help='list supported solvers, per problem category')
 	neos.add_argument('--solver-cats', action='store_true', help='list supported problem categories, per solver')
 	neos.add_argument('--neos-info', action='store_true', help='show all the lists above')
+	neos.add_argument('--refresh-neos-info', action='store_true', help='update the stored NEOS solver information')
+	neos.add_argument('--ping', action='store_true', help='check the connection to the NEOS server')
+	return parser
+
 
-	# prepare command line arguments for parse_args
+def main(argv=None):
+	#log_levels = [v.lower() for k,v in logging._levelToName.items() if k > 0]
+
+	# prepare command line arguments
 	# - accepts None - uses sys.argv[1:] in that case
 	# - otherwise, argv should be a list of strings
-	if isinstance(argv, str):
+	if argv is None:
+		argv = sys.argv[1:]
+	elif isinstance(argv, str):
 		argv = argv.split()
+
+	# fast path for calls from Mosel (i.e., every solve) - no need for argparse
+	if _mosel_call_args(argv):
+		_install_rich()
+		_setup_logging()
+		if not ('-s' in argv and '-e' in argv):
+			logger.warning(f"Unexpected format of Mosel solver arguments: {argv}")
+		solve_nl_file(argv[0])
+		return
+
+	_setup_logging()
+	parser = _build_parser()
 	args = parser.parse_args(argv)
 
 	if len(args.args) == 0: